@@ -1,18 +1,257 @@
-import boto3
+import asyncio
+from contextlib import suppress
+
+import aioboto3
+from aiobotocore.config import AioConfig
 from botocore.exceptions import ClientError
+from cachetools import TTLCache
+from fastapi import Request
 from .config import settings
 
-def get_ec2_client():
-    return boto3.client(
-        'ec2',
-        aws_access_key_id=settings.aws_access_key_id,
-        aws_secret_access_key=settings.aws_secret_access_key,
+def create_aws_session():
+    # Empty credentials fall through to the default provider chain
+    return aioboto3.Session(
+        aws_access_key_id=settings.aws_access_key_id or None,
+        aws_secret_access_key=settings.aws_secret_access_key or None,
         region_name=settings.aws_region
     )
 
+# Shared by every call on the app's EC2 client: a larger connection pool and
+# adaptive retries that back off under EC2 API throttling. aiobotocore's own
+# 12s idle keep-alive is kept, as it stays under AWS's server-side timeout.
+EC2_CLIENT_CONFIG = AioConfig(
+    max_pool_connections=50,
+    retries={'mode': 'adaptive', 'max_attempts': 10},
+    connect_timeout=3,
+    read_timeout=10
+)
+
+def get_ec2_client(request: Request):
+    return request.app.state.ec2_client
+
+def get_instance_batcher(request: Request):
+    return request.app.state.instance_batcher
+
+class _Coalescer:
+    """Collects keys submitted within a short window and resolves them with one call.
+
+    ``flush`` receives the distinct keys of a batch and returns a dict mapping
+    each key to its result, or to an exception for that key alone.
+    """
+
+    def __init__(self, flush, max_batch, max_delay):
+        self._flush = flush
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._queue = asyncio.Queue()
+        self._worker = None
+        self._inflight = set()
+
+    def start(self):
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        tasks = [self._worker, *self._inflight] if self._worker else list(self._inflight)
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+
+    async def submit(self, key):
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((key, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._max_delay
+            while len(batch) < self._max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Dispatch in the background so the next window opens immediately
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch):
+        waiters = {}
+        for key, future in batch:
+            waiters.setdefault(key, []).append(future)
+        
+        try:
+            results = await self._flush(list(waiters))
+        except Exception as e:
+            results = {key: e for key in waiters}
+        
+        for key, futures in waiters.items():
+            result = results.get(key)
+            for future in futures:
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+# Errors that can be caused by a single ID rather than the request as a whole
+_PER_ID_ERROR_CODES = frozenset({
+    'InvalidInstanceID.NotFound',
+    'InvalidInstanceID.Malformed'
+})
+# TerminateInstances also checks termination protection and resource-level
+# IAM permissions per instance, so one protected or disallowed instance fails
+# the whole call. Terminating is idempotent, so retrying IDs alone is safe.
+_TERMINATE_PER_ID_ERROR_CODES = _PER_ID_ERROR_CODES | {
+    'OperationNotPermitted',
+    'UnauthorizedOperation'
+}
+# Upper bound on single-ID calls while isolating a bad ID from its batch
+_FALLBACK_CONCURRENCY = 5
+
+def _check_instance_id(instance_id):
+    # Rejected here, before batching: botocore would otherwise fail the whole
+    # shared request with a ParamValidationError.
+    if not isinstance(instance_id, str) or not instance_id:
+        raise ValueError(f"Invalid instance ID: {instance_id!r}")
+    return instance_id
+
+class InstanceBatcher:
+    """Coalesces per-instance DescribeInstances/TerminateInstances calls.
+
+    Requests for different instances arriving within ``max_delay`` seconds
+    share a single EC2 API call, which keeps concurrent syncs well below the
+    EC2 request rate limits.
+    """
+
+    def __init__(self, ec2_client, max_batch=100, max_delay=0.3):
+        self._ec2_client = ec2_client
+        self._describe = _Coalescer(self._describe_instances, max_batch, max_delay)
+        # TerminateInstances accepts up to 1000 IDs per call
+        self._terminate = _Coalescer(self._terminate_instances, 1000, max_delay)
+
+    def start(self):
+        self._describe.start()
+        self._terminate.start()
+
+    async def stop(self):
+        await self._describe.stop()
+        await self._terminate.stop()
+
+    async def describe(self, instance_id):
+        """Return the instance description, or None if EC2 does not report it."""
+        return await self._describe.submit(_check_instance_id(instance_id))
+
+    async def terminate(self, instance_id):
+        """Request termination and return the instance's state change."""
+        return await self._terminate.submit(_check_instance_id(instance_id))
+
+    async def _describe_instances(self, instance_ids):
+        return await self._with_fallback(self._describe_call, instance_ids, _PER_ID_ERROR_CODES)
+
+    async def _terminate_instances(self, instance_ids):
+        return await self._with_fallback(self._terminate_call, instance_ids, _TERMINATE_PER_ID_ERROR_CODES)
+
+    async def _describe_call(self, instance_ids):
+        response = await self._ec2_client.describe_instances(InstanceIds=instance_ids)
+        return {
+            instance['InstanceId']: instance
+            for reservation in response['Reservations']
+            for instance in reservation['Instances']
+        }
+
+    async def _terminate_call(self, instance_ids):
+        response = await self._ec2_client.terminate_instances(InstanceIds=instance_ids)
+        return {change['InstanceId']: change for change in response['TerminatingInstances']}
+
+    async def _with_fallback(self, call, instance_ids, per_id_error_codes):
+        try:
+            return await call(instance_ids)
+        except ClientError as e:
+            # Throttling and service errors affect every ID alike and are
+            # raised to all waiters; only errors that may stem from a single
+            # ID are isolated.
+            if len(instance_ids) == 1 or e.response.get('Error', {}).get('Code') not in per_id_error_codes:
+                raise
+        
+        # One bad ID fails the whole request, so retry each ID on its own to
+        # confine the error to its caller.
+        limit = asyncio.Semaphore(_FALLBACK_CONCURRENCY)
+        
+        async def call_one(instance_id):
+            async with limit:
+                return await call([instance_id])
+        
+        results = await asyncio.gather(
+            *(call_one(instance_id) for instance_id in instance_ids),
+            return_exceptions=True
+        )
+        return {
+            instance_id: result if isinstance(result, BaseException) else result.get(instance_id)
+            for instance_id, result in zip(instance_ids, results)
+        }
+
+# SSH, HTTP and HTTPS from anywhere; botocore accepts tuples for list params
+_INGRESS_RULES = (
+    {'IpProtocol': 'tcp', 'FromPort': 22, 'ToPort': 22, 'IpRanges': ({'CidrIp': '0.0.0.0/0'},)},
+    {'IpProtocol': 'tcp', 'FromPort': 80, 'ToPort': 80, 'IpRanges': ({'CidrIp': '0.0.0.0/0'},)},
+    {'IpProtocol': 'tcp', 'FromPort': 443, 'ToPort': 443, 'IpRanges': ({'CidrIp': '0.0.0.0/0'},)}
+)
+
+# Security group and VPC IDs rarely change, so they are remembered per region
+# instead of being looked up on every deployment. Group names come from user
+# input, so that cache is bounded and entries expire.
+_sg_cache = TTLCache(maxsize=1024, ttl=3600)
+_vpc_cache: dict = {}
+# Locks only exist while a lookup for their key is in flight
+_cache_locks: dict = {}
+
+async def _cached(cache, key, load):
+    value = cache.get(key)
+    if value is not None:
+        return value
+    
+    lock = _cache_locks.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            value = cache.get(key)
+            if value is None:
+                value = await load()
+                if value is not None:
+                    cache[key] = value
+    finally:
+        # Waiters keep their reference to the lock and re-check the cache
+        if _cache_locks.get(key) is lock:
+            del _cache_locks[key]
+    return value
+
+def invalidate_security_group(ec2_client, group_name):
+    _sg_cache.pop((ec2_client.meta.region_name, group_name), None)
+
+async def _get_vpc_id(ec2_client):
+    async def load():
+        vpc_response = await ec2_client.describe_vpcs()
+        return vpc_response['Vpcs'][0]['VpcId'] if vpc_response['Vpcs'] else None
+    
+    return await _cached(_vpc_cache, ec2_client.meta.region_name, load)
+
 async def create_security_group(ec2_client, group_name):
+    return await _cached(
+        _sg_cache,
+        (ec2_client.meta.region_name, group_name),
+        lambda: _find_or_create_security_group(ec2_client, group_name)
+    )
+
+async def _find_or_create_security_group(ec2_client, group_name):
     try:
-        response = ec2_client.describe_security_groups(
+        response = await ec2_client.describe_security_groups(
             Filters=[{'Name': 'group-name', 'Values': [group_name]}]
         )
         if response['SecurityGroups']:
@@ -20,24 +259,24 @@ async def create_security_group(ec2_client, group_name):
     except ClientError:
         pass
     
-    vpc_response = ec2_client.describe_vpcs()
-    vpc_id = vpc_response['Vpcs'][0]['VpcId'] if vpc_response['Vpcs'] else None
+    vpc_id = await _get_vpc_id(ec2_client)
     
-    response = ec2_client.create_security_group(
+    response = await ec2_client.create_security_group(
         GroupName=group_name,
         Description='Security group for EC2 deployer application',
-        VpcId=vpc_id
+        VpcId=vpc_id,
+        # Tag on create rather than with a separate CreateTags call
+        TagSpecifications=[{
+            'ResourceType': 'security-group',
+            'Tags': [{'Key': 'Name', 'Value': group_name}]
+        }]
     )
     
     group_id = response['GroupId']
     
-    ec2_client.authorize_security_group_ingress(
+    await ec2_client.authorize_security_group_ingress(
         GroupId=group_id,
-        IpPermissions=[
-            {'IpProtocol': 'tcp', 'FromPort': 22, 'ToPort': 22, 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]},
-            {'IpProtocol': 'tcp', 'FromPort': 80, 'ToPort': 80, 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]},
-            {'IpProtocol': 'tcp', 'FromPort': 443, 'ToPort': 443, 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]}
-        ]
+        IpPermissions=_INGRESS_RULES
     )
     
     return group_id
\ No newline at end of file
@@ -1,3 +1,4 @@
+from functools import cached_property, lru_cache
 from pydantic_settings import BaseSettings
 from typing import List
 import os
@@ -17,9 +18,17 @@ class Settings(BaseSettings):
     db_name: str = os.getenv("DB_NAME", "ec2_deployer")
     db_user: str = os.getenv("DB_USER", "postgres")
     db_password: str = os.getenv("DB_PASSWORD", "password")
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "20"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
     
-    # CORS Configuration - Don't define as a field, use a method instead
-    def get_cors_origins(self) -> List[str]:
+    # Enables SQL echo and other development-only behaviour
+    debug: bool = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
+    
+    # CORS Configuration - not a field, since pydantic would expect a JSON list;
+    # parsed once on first access instead
+    @cached_property
+    def cors_origins(self) -> List[str]:
         cors_str = os.getenv("CORS_ORIGINS", "http://localhost:3000")
         return [origin.strip() for origin in cors_str.split(",") if origin.strip()]
     
@@ -31,4 +40,8 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    return Settings()
+
+settings = get_settings()
\ No newline at end of file
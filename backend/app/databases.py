@@ -1,13 +1,27 @@
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from .config import settings
 from .models import Base
 
-# Create async engine
+# Create async engine with a persistent connection pool
 engine = create_async_engine(
     settings.database_url,
-    echo=True,
-    future=True
+    echo=settings.debug,
+    future=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_pre_ping=True,
+    pool_recycle=settings.db_pool_recycle,
+    pool_use_lifo=True,
+    connect_args={
+        # Keep more prepared statements per connection so repeated queries
+        # skip parse/plan
+        "prepared_statement_cache_size": 500,
+        "statement_cache_size": 500,
+        # Short OLTP queries never benefit from JIT compilation
+        "server_settings": {"jit": "off"}
+    }
 )
 
 # Create async session factory
@@ -22,6 +36,39 @@ async def get_db():
         finally:
             await session.close()
 
+def get_session_factory():
+    # For handlers that open their own short-lived sessions around slow I/O
+    return AsyncSessionLocal
+
+_TIMESTAMP_COLUMNS = ("launch_time", "created_at", "updated_at")
+
+def _timestamptz_upgrade(column):
+    # Earlier releases used naive timestamp columns holding UTC values
+    return f"""
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND table_name = 'deployments'
+          AND column_name = '{column}') = 'timestamp without time zone' THEN
+        ALTER TABLE deployments
+            ALTER COLUMN {column} TYPE TIMESTAMP WITH TIME ZONE USING {column} AT TIME ZONE 'UTC';
+    END IF;
+END $$"""
+
+# create_all never alters an existing table, so schema changes to tables created
+# by earlier releases are applied here. Every statement must be idempotent.
+_SCHEMA_UPGRADES = (
+    # Pending rows are written before EC2 assigns an instance ID
+    "ALTER TABLE deployments ALTER COLUMN instance_id DROP NOT NULL",
+    # Timestamps are timezone-aware and generated by the server
+    *(_timestamptz_upgrade(column) for column in _TIMESTAMP_COLUMNS),
+    *(f"ALTER TABLE deployments ALTER COLUMN {column} SET DEFAULT now()" for column in _TIMESTAMP_COLUMNS),
+    "CREATE INDEX IF NOT EXISTS ix_deployments_created_at ON deployments (created_at)",
+)
+
 async def init_db():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        await conn.run_sync(Base.metadata.create_all)
+        for statement in _SCHEMA_UPGRADES:
+            await conn.execute(text(statement))
\ No newline at end of file
@@ -1,46 +1,75 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from botocore.exceptions import ClientError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy import bindparam, insert, text, update
 from sqlalchemy.future import select
-from typing import List
+from typing import Optional
+import asyncio
 import logging
 
-from .config import settings
-from .databases import get_db, init_db
+from .config import get_settings
+from .databases import engine, get_db, get_session_factory, init_db
 from .models import Deployment
-from .schemas import DeploymentCreate, Deployment, DeploymentResponse, HealthCheck
-from .aws import get_ec2_client, create_security_group
+from .schemas import (
+    DeploymentCreate, Deployment as DeploymentSchema, DeploymentList, DeploymentResponse, HealthCheck
+)
+from .aws import (
+    EC2_CLIENT_CONFIG, InstanceBatcher, create_aws_session, get_ec2_client, get_instance_batcher,
+    create_security_group, invalidate_security_group
+)
 from datetime import datetime, timezone
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="EC2 Deployer API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    logger.info("Database initialized")
+    # One session for the app lifetime so credentials are resolved once
+    app.state.aio_session = create_aws_session()
+    # A single EC2 client keeps its HTTPS connection pool warm across requests
+    async with app.state.aio_session.client('ec2', config=EC2_CLIENT_CONFIG) as ec2_client:
+        app.state.ec2_client = ec2_client
+        app.state.instance_batcher = InstanceBatcher(ec2_client)
+        app.state.instance_batcher.start()
+        try:
+            yield
+        finally:
+            await app.state.instance_batcher.stop()
+    await engine.dispose()
+
+app = FastAPI(
+    title="EC2 Deployer API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.get_cors_origins(),
+    allow_origins=get_settings().cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-async def startup_event():
-    await init_db()
-    logger.info("Database initialized")
-
 @app.get("/", include_in_schema=False)
 async def root():
     return {"message": "EC2 Deployer API"}
 
 @app.get("/health", response_model=HealthCheck)
-async def health_check(db: AsyncSession = Depends(get_db)):
+async def health_check():
     try:
-        # Test database connection
-        await db.execute("SELECT 1")
+        # Test database connection without building an ORM session
+        async with engine.connect() as conn:
+            await conn.scalar(text("SELECT 1"))
         return HealthCheck(status="healthy", database="connected")
     except Exception as e:
         raise HTTPException(
@@ -48,31 +77,59 @@ async def health_check(db: AsyncSession = Depends(get_db)):
             detail=f"Database connection failed: {str(e)}"
         )
 
+async def _insert_pending_deployment(session_factory, deployment):
+    async with session_factory() as db:
+        result = await db.execute(
+            insert(Deployment)
+            .values(
+                instance_name=deployment.instance_name,
+                instance_type=deployment.instance_type,
+                ami_id=deployment.ami_id,
+                key_name=deployment.key_name,
+                status="pending"
+            )
+            .returning(Deployment.id)
+        )
+        deployment_id = result.scalar_one()
+        await db.commit()
+    return deployment_id
+
+async def _mark_deployment_failed(session_factory, deployment_id):
+    try:
+        async with session_factory() as db:
+            await db.execute(update(Deployment).where(Deployment.id == deployment_id).values(status="failed"))
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Could not mark deployment {deployment_id} as failed: {e}")
+
 @app.post("/api/deploy", response_model=DeploymentResponse)
 async def deploy_instance(
     deployment: DeploymentCreate,
-    db: AsyncSession = Depends(get_db)
+    session_factory: sessionmaker = Depends(get_session_factory),
+    ec2_client=Depends(get_ec2_client)
 ):
+    # Each DB phase uses its own short-lived session so no pooled connection
+    # is held while waiting on AWS.
+    group_name = f"sg-{deployment.instance_name.lower()}"
+    deployment_id = None
+    launched = False
     try:
-        ec2_client = get_ec2_client()
-        security_group_id = await create_security_group(ec2_client, f"sg-{deployment.instance_name.lower()}")
-        
-        # Create deployment record
-        db_deployment = Deployment(
-            instance_name=deployment.instance_name,
-            instance_type=deployment.instance_type,
-            ami_id=deployment.ami_id,
-            key_name=deployment.key_name,
-            status="pending",
-            security_group_id=security_group_id
+        # The security group lookup and the pending record are independent,
+        # so overlap the EC2 and database round-trips. Both are awaited to
+        # completion so a committed row is known even if the other fails.
+        security_group_id, inserted = await asyncio.gather(
+            create_security_group(ec2_client, group_name),
+            _insert_pending_deployment(session_factory, deployment),
+            return_exceptions=True
         )
-        
-        db.add(db_deployment)
-        await db.commit()
-        await db.refresh(db_deployment)
+        if not isinstance(inserted, BaseException):
+            deployment_id = inserted
+        for result in (security_group_id, inserted):
+            if isinstance(result, BaseException):
+                raise result
         
         # Launch EC2 instance
-        response = ec2_client.run_instances(
+        response = await ec2_client.run_instances(
             ImageId=deployment.ami_id,
             InstanceType=deployment.instance_type,
             KeyName=deployment.key_name,
@@ -83,53 +140,82 @@ async def deploy_instance(
                 'ResourceType': 'instance',
                 'Tags': [
                     {'Key': 'Name', 'Value': deployment.instance_name},
-                    {'Key': 'DeploymentID', 'Value': str(db_deployment.id)}
+                    {'Key': 'DeploymentID', 'Value': str(deployment_id)}
                 ]
             }]
         )
         
+        launched = True
         instance = response['Instances'][0]
-        db_deployment.instance_id = instance['InstanceId']
-        db_deployment.launch_time = instance.get('LaunchTime', datetime.now(timezone.utc))
+        instance_id = instance['InstanceId']
+        values = {
+            'instance_id': instance_id,
+            'launch_time': instance.get('LaunchTime', datetime.now(timezone.utc)),
+            'security_group_id': security_group_id,
+            'status': "running"
+        }
         
         # Update instance details
         if 'PublicIpAddress' in instance:
-            db_deployment.public_ip = instance['PublicIpAddress']
+            values['public_ip'] = instance['PublicIpAddress']
         if 'PrivateIpAddress' in instance:
-            db_deployment.private_ip = instance['PrivateIpAddress']
+            values['private_ip'] = instance['PrivateIpAddress']
         if 'SubnetId' in instance:
-            db_deployment.subnet_id = instance['SubnetId']
+            values['subnet_id'] = instance['SubnetId']
         if 'VpcId' in instance:
-            db_deployment.vpc_id = instance['VpcId']
+            values['vpc_id'] = instance['VpcId']
         if 'Placement' in instance:
-            db_deployment.az = instance['Placement'].get('AvailabilityZone')
+            values['az'] = instance['Placement'].get('AvailabilityZone')
         
-        db_deployment.status = "running"
-        await db.commit()
+        async with session_factory() as db:
+            await db.execute(update(Deployment).where(Deployment.id == deployment_id).values(**values))
+            await db.commit()
         
-        logger.info(f"Successfully deployed instance {db_deployment.instance_id}")
+        logger.info(f"Successfully deployed instance {instance_id}")
         
         return DeploymentResponse(
             success=True,
-            instance_id=db_deployment.instance_id,
-            deployment_id=db_deployment.id,
-            message=f"Instance {db_deployment.instance_id} launched successfully!"
+            instance_id=instance_id,
+            deployment_id=deployment_id,
+            message=f"Instance {instance_id} launched successfully!"
         )
         
     except Exception as e:
-        await db.rollback()
+        # The cached group was deleted outside the app; look it up again next time
+        if isinstance(e, ClientError) and e.response.get('Error', {}).get('Code') == 'InvalidGroup.NotFound':
+            invalidate_security_group(ec2_client, group_name)
+        # Don't leave a row pending forever when no instance was launched
+        if deployment_id is not None and not launched:
+            await _mark_deployment_failed(session_factory, deployment_id)
         logger.error(f"Deployment error: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
 
-@app.get("/api/deployments", response_model=List[Deployment])
-async def get_deployments(db: AsyncSession = Depends(get_db)):
+@app.get("/api/deployments", response_model=DeploymentList)
+async def get_deployments(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
     try:
-        result = await db.execute(select(Deployment).order_by(Deployment.created_at.desc()))
-        deployments = result.scalars().all()
-        return deployments
+        # Keyset pagination on the primary key, newest first. `cursor` is the
+        # next_cursor returned by the previous page.
+        # Rows are read as plain mappings; the ORM is skipped since the list is
+        # only serialised, never modified.
+        table = Deployment.__table__
+        stmt = select(table).order_by(table.c.id.desc()).limit(limit + 1)
+        if cursor is not None:
+            stmt = stmt.where(table.c.id < cursor)
+        result = await db.execute(stmt)
+        deployments = result.mappings().all()
+        
+        next_cursor = None
+        if len(deployments) > limit:
+            deployments = deployments[:limit]
+            next_cursor = deployments[-1]['id']
+        return {"deployments": deployments, "next_cursor": next_cursor}
     except Exception as e:
         logger.error(f"Error fetching deployments: {e}")
         raise HTTPException(
@@ -137,43 +223,40 @@ async def get_deployments(db: AsyncSession = Depends(get_db)):
             detail=str(e)
         )
 
-@app.get("/api/deployments/{deployment_id}", response_model=Deployment)
-async def get_deployment(deployment_id: int, db: AsyncSession = Depends(get_db)):
-    try:
-        result = await db.execute(select(Deployment).where(Deployment.id == deployment_id))
+# Built once at import; each lookup only binds the id
+_deployment_by_id = select(Deployment).where(Deployment.id == bindparam("deployment_id"))
+
+async def get_deployment_or_404(
+    deployment_id: int,
+    session_factory: sessionmaker = Depends(get_session_factory)
+) -> Deployment:
+    # Uses its own short session so the connection is released before the
+    # endpoint starts any AWS calls.
+    async with session_factory() as db:
+        result = await db.execute(_deployment_by_id, {"deployment_id": deployment_id})
         deployment = result.scalar_one_or_none()
-        
-        if not deployment:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Deployment not found"
-            )
-            
-        return deployment
-    except Exception as e:
-        logger.error(f"Error fetching deployment: {e}")
+    
+    if not deployment:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deployment not found"
         )
+    return deployment
 
-@app.post("/api/deployments/{deployment_id}/sync", response_model=Deployment)
-async def sync_deployment(deployment_id: int, db: AsyncSession = Depends(get_db)):
+@app.get("/api/deployments/{deployment_id}", response_model=DeploymentSchema)
+async def get_deployment(deployment: Deployment = Depends(get_deployment_or_404)):
+    return deployment
+
+@app.post("/api/deployments/{deployment_id}/sync", response_model=DeploymentSchema)
+async def sync_deployment(
+    deployment: Deployment = Depends(get_deployment_or_404),
+    session_factory: sessionmaker = Depends(get_session_factory),
+    batcher: InstanceBatcher = Depends(get_instance_batcher)
+):
     try:
-        result = await db.execute(select(Deployment).where(Deployment.id == deployment_id))
-        deployment = result.scalar_one_or_none()
+        instance = await batcher.describe(deployment.instance_id) if deployment.instance_id else None
         
-        if not deployment:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Deployment not found"
-            )
-        
-        ec2_client = get_ec2_client()
-        response = ec2_client.describe_instances(InstanceIds=[deployment.instance_id])
-        
-        if response['Reservations'] and response['Reservations'][0]['Instances']:
-            instance = response['Reservations'][0]['Instances'][0]
+        if instance:
             deployment.status = instance['State']['Name']
             
             if 'PublicIpAddress' in instance:
@@ -181,14 +264,18 @@ async def sync_deployment(deployment_id: int, db: AsyncSession = Depends(get_db)
             if 'PrivateIpAddress' in instance:
                 deployment.private_ip = instance['PrivateIpAddress']
             
-            await db.commit()
+            async with session_factory() as db:
+                db.add(deployment)
+                await db.commit()
             return deployment
         else:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Instance not found in AWS"
             )
-            
+    
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Sync error: {e}")
         raise HTTPException(
@@ -197,27 +284,31 @@ async def sync_deployment(deployment_id: int, db: AsyncSession = Depends(get_db)
         )
 
 @app.delete("/api/deployments/{deployment_id}")
-async def terminate_deployment(deployment_id: int, db: AsyncSession = Depends(get_db)):
+async def terminate_deployment(
+    deployment: Deployment = Depends(get_deployment_or_404),
+    session_factory: sessionmaker = Depends(get_session_factory),
+    batcher: InstanceBatcher = Depends(get_instance_batcher)
+):
     try:
-        result = await db.execute(select(Deployment).where(Deployment.id == deployment_id))
-        deployment = result.scalar_one_or_none()
+        # No instance was ever launched for this deployment, so there is
+        # nothing to terminate in AWS
+        if not deployment.instance_id:
+            deployment.status = "terminated"
+            async with session_factory() as db:
+                db.add(deployment)
+                await db.commit()
+            return {"success": True, "message": "No instance was launched; deployment marked terminated"}
         
-        if not deployment:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Deployment not found"
-            )
-        
-        ec2_client = get_ec2_client()
-        ec2_client.terminate_instances(InstanceIds=[deployment.instance_id])
+        await batcher.terminate(deployment.instance_id)
         
         deployment.status = "terminating"
-        await db.commit()
+        async with session_factory() as db:
+            db.add(deployment)
+            await db.commit()
         
         return {"success": True, "message": "Instance termination initiated"}
         
     except Exception as e:
-        await db.rollback()
         logger.error(f"Termination error: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
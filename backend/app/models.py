@@ -1,14 +1,16 @@
 from sqlalchemy import Column, Integer, String, DateTime
 from sqlalchemy.ext.declarative import declarative_base
-from datetime import datetime, timezone
+from sqlalchemy.sql import func
 
 Base = declarative_base()
 
 class Deployment(Base):
     __tablename__ = "deployments"
+    # Fetch server-generated timestamps via RETURNING instead of expiring them
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
-    instance_id = Column(String(50), unique=True, index=True, nullable=False)
+    instance_id = Column(String(50), unique=True, index=True, nullable=True)
     instance_name = Column(String(100), nullable=False)
     instance_type = Column(String(20), nullable=False)
     ami_id = Column(String(50), nullable=False)
@@ -20,6 +22,6 @@ class Deployment(Base):
     vpc_id = Column(String(50), nullable=True)
     subnet_id = Column(String(50), nullable=True)
     az = Column(String(50), nullable=True)
-    launch_time = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
\ No newline at end of file
+    launch_time = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), index=True, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class DeploymentBase(BaseModel):
     instance_name: str
@@ -12,8 +12,10 @@ class DeploymentCreate(DeploymentBase):
     pass
 
 class Deployment(DeploymentBase):
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
-    instance_id: str
+    instance_id: Optional[str] = None
     status: str
     public_ip: Optional[str] = None
     private_ip: Optional[str] = None
@@ -24,9 +26,10 @@ class Deployment(DeploymentBase):
     launch_time: datetime
     created_at: datetime
     updated_at: datetime
-    
-    class Config:
-        from_attributes = True
+
+class DeploymentList(BaseModel):
+    deployments: List[Deployment]
+    next_cursor: Optional[int] = None
 
 class DeploymentResponse(BaseModel):
     success: bool
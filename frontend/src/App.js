@@ -22,8 +22,17 @@ function App() {
 
   const loadDeployments = async () => {
     try {
-      const response = await axios.get(`${API_BASE_URL}/deployments`);
-      setDeployments(response.data.deployments);
+      // The API pages results; follow next_cursor until every page is loaded
+      const allDeployments = [];
+      let cursor = null;
+      do {
+        const response = await axios.get(`${API_BASE_URL}/deployments`, {
+          params: { limit: 500, cursor }
+        });
+        allDeployments.push(...response.data.deployments);
+        cursor = response.data.next_cursor;
+      } while (cursor != null);
+      setDeployments(allDeployments);
     } catch (error) {
       toast.error('Failed to load deployments');
     }